@@ -1,18 +1,22 @@
-from flask import Flask, request, jsonify
+from quart import Quart, Response, request
 import google.generativeai as genai
 import os
-from flask_cors import CORS
+import asyncio
+from quart_cors import cors
 from dotenv import load_dotenv
-import base64
-from icalendar import Calendar, Event
-from datetime import datetime, timedelta
-import uuid
+import pybase64
+from datetime import date, datetime, timedelta, timezone
 import json
+import orjson
 import re
+from functools import lru_cache
 
 load_dotenv()
-app = Flask(__name__)
-CORS(app)  # Enable CORS for all routes
+app = Quart(__name__)
+app = cors(app)  # Enable CORS for all routes
+
+# Bound request bodies; base64 image and audio uploads are the largest payloads
+app.config['MAX_CONTENT_LENGTH'] = 20 * 1024 * 1024
 
 # Configure the Gemini API with your API key
 genai.configure(api_key=os.environ.get("GEMINI_API_KEY"))
@@ -20,17 +24,8 @@ genai.configure(api_key=os.environ.get("GEMINI_API_KEY"))
 # Initialize the model - use gemini-1.5-pro for multimodal capabilities
 model = genai.GenerativeModel('gemini-2.0-flash')
 
-# Function to parse calendar event information
-def parse_calendar_event(user_message, chat_history=None):
-    context = ""
-    if chat_history:
-        context = f"Previous conversation context:\n{chat_history}\n\n"
-    
-    # Get current date to use for the event
-    current_date = datetime.now().strftime('%Y-%m-%d')
-    # print(current_date)
-    
-    prompt = f"""
+# Prompt used to detect and extract calendar events; filled in per request with format_map
+EVENT_PROMPT_TEMPLATE = """
     {context}
     User message: "{user_message}"
     
@@ -52,10 +47,7 @@ def parse_calendar_event(user_message, chat_history=None):
         "specified_date": true or false (whether the user specifically mentioned a date)
     }}
     
-    If this message doesn't describe a calendar event or is inappropriate, just return:
-    {{
-        "is_event": false
-    }}
+    {non_event_instructions}
     
     Pay special attention to the following:
     1. Use proper capitalization for event titles (e.g., "Team Meeting" not "team meeting")
@@ -65,15 +57,85 @@ def parse_calendar_event(user_message, chat_history=None):
     
     Reply with only the JSON object, no other text.
     """
+
+# Non-event instructions for text messages: the detection call answers them directly
+NON_EVENT_REPLY_INSTRUCTIONS = """If this message doesn't describe a calendar event or is inappropriate, answer it yourself instead and return:
+    {
+        "is_event": false,
+        "reply": "Your response to the user's message"
+    }
+    When writing the reply, you are LiteCal, an AI assistant specialized in managing calendars and events.
+    Format times in 12-hour format (e.g., "2:00 PM" not "14:00") and ensure proper grammar and punctuation.
+    Politely decline inappropriate requests in the reply."""
+
+# Non-event instructions for image/audio requests: the reply needs the media, so a second call writes it
+NON_EVENT_ONLY_INSTRUCTIONS = """If this message doesn't describe a calendar event or is inappropriate, just return:
+    {
+        "is_event": false
+    }"""
+
+# Words and time expressions that suggest an image/audio caption may describe a calendar event
+EVENT_HINT_PATTERN = re.compile(
+    r'\b(?:meet(?:ing)?s?|schedul\w*|appointments?|appts?|remind\w*|calendar|cal|events?|book\w*|plan\w*|'
+    r'add|create|set\s+up|put|'
+    r'reserv\w*|lunch|dinner|breakfast|brunch|coffee|call|party|class(?:es)?|lecture|exam|interview|'
+    r'deadline|due|birthday|anniversary|conference|session|workshop|practice|game|flight|trip|'
+    r'today|tonight|tomorrow|noon|midnight|mornings?|afternoons?|evenings?|nights?|'
+    r'days?|weeks?|weekends?|months?|years?|'
+    r'minutes?|mins?|hours?|hrs?|'
+    r'mon|tues?|wed(?:nes)?|thu(?:rs?)?|fri|sat(?:ur)?|sun|\w+days?|'
+    r'jan|feb|mar|apr|may|jun|jul|aug|sept?|oct|nov|dec|\w+uary|march|april|june|july|august|\w+ber)\b'
+    r'|\d{1,2}(?::\d{2})?\s*[ap]\.?m\b|\d{1,2}:\d{1,2}|\d{1,2}[/-]\d{1,2}|\b\d{1,2}(?:st|nd|rd|th)\b|'
+    r'\b(?:at|on|by|from|until|in) \d|'
+    r'\b(?:at|in) (?:one|two|three|four|five|six|seven|eight|nine|ten|eleven|twelve|an?|half)\b',
+    re.IGNORECASE
+)
+
+# Decoder used to read a single JSON object out of surrounding text
+# (strict=False accepts the literal newlines Gemini leaves in multi-line replies)
+JSON_DECODER = json.JSONDecoder(strict=False)
+
+# Helper function to pull the first JSON object out of a Gemini reply (None if there is none)
+def extract_json_object(text):
+    json_start = text.find('{')
+    if json_start == -1:
+        return None
+    json_end = text.rfind('}')
+    try:
+        # Usual case: the reply is one object, possibly wrapped in a code fence
+        return orjson.loads(text[json_start:json_end + 1])
+    except orjson.JSONDecodeError:
+        # Other braces follow the object, so decode only the object starting at the first '{'
+        return JSON_DECODER.raw_decode(text, json_start)[0]
+
+# Function to parse calendar event information
+async def parse_calendar_event(user_message, chat_history=None, current_date=None, has_media=False):
+    # Image/audio requests need a second Gemini call for the reply, so skip detection when the
+    # caption shows no sign of an event; text messages are answered by this call either way
+    if has_media and not EVENT_HINT_PATTERN.search(user_message or ''):
+        return {"is_event": False}
+    
+    context = ""
+    if chat_history:
+        context = f"Previous conversation context:\n{chat_history}\n\n"
+    
+    # Get current date to use for the event (the caller passes it in so it is computed once per request)
+    if current_date is None:
+        current_date = datetime.now().strftime('%Y-%m-%d')
     
-    response = model.generate_content(prompt)
+    prompt = EVENT_PROMPT_TEMPLATE.format_map({
+        'context': context,
+        'user_message': user_message,
+        'current_date': current_date,
+        'non_event_instructions': NON_EVENT_ONLY_INSTRUCTIONS if has_media else NON_EVENT_REPLY_INSTRUCTIONS
+    })
+    
+    response = await model.generate_content_async(prompt)
     
     try:
         # Extract JSON from the response
-        json_pattern = r'({.*})'
-        match = re.search(json_pattern, response.text, re.DOTALL)
-        if match:
-            event_data = json.loads(match.group(1))
+        event_data = extract_json_object(response.text)
+        if event_data is not None:
             
             # Add current_date to the event data for use in create_ics_file
             event_data['current_date'] = current_date
@@ -105,96 +167,144 @@ def parse_calendar_event(user_message, chat_history=None):
         print(f"Error parsing event data: {e}")
         return {"is_event": False}
 
-# Function to create ICS file
-def create_ics_file(event_data):
-    cal = Calendar()
-    cal.add('prodid', '-//LiteCal//litecal.app//')
-    cal.add('version', '2.0')
-    
-    event = Event()
+# Fixed layout of every generated ICS file; the property lines are built by ics_property
+ICS_TEMPLATE = (
+    "BEGIN:VCALENDAR\r\n"
+    "VERSION:2.0\r\n"
+    "PRODID:-//LiteCal//litecal.app//\r\n"
+    "BEGIN:VEVENT\r\n"
+    "{summary}"
+    "DTSTART:{dtstart}\r\n"
+    "DTEND:{dtend}\r\n"
+    "{details}"
+    "UID:{uid}\r\n"
+    "DTSTAMP:{dtstamp}\r\n"
+    "BEGIN:VALARM\r\n"
+    "ACTION:DISPLAY\r\n"
+    "{reminder}"
+    "TRIGGER:-PT10M\r\n"
+    "END:VALARM\r\n"
+    "END:VEVENT\r\n"
+    "END:VCALENDAR\r\n"
+)
+
+# iCalendar date-time format (floating local time; append 'Z' for UTC)
+ICS_DATETIME_FORMAT = '%Y%m%dT%H%M%S'
+
+# Characters that must be escaped in iCalendar TEXT values (RFC 5545 section 3.3.11)
+ICS_TEXT_ESCAPES = str.maketrans({'\\': '\\\\', ';': '\\;', ',': '\\,', '\n': '\\n', '\r': ''})
+
+# Line breaks removed from values that are written without TEXT escaping
+ICS_LINE_BREAKS = str.maketrans('', '', '\r\n')
+
+# Helper function to emit one iCalendar content line, folded at 75 octets as RFC 5545 requires
+def ics_property(name, value, escape=True):
+    if escape:
+        value = value.translate(ICS_TEXT_ESCAPES)
+    line = f"{name}:{value}"
+    if len(line) <= 75 and line.isascii():
+        return line + "\r\n"
+    
+    # Fold without splitting multi-byte UTF-8 characters; continuation lines start with a space
+    folded = []
+    current = []
+    size = 0
+    limit = 75
+    for char in line:
+        char_size = len(char.encode('utf-8'))
+        if size + char_size > limit:
+            folded.append(''.join(current))
+            current = []
+            size = 0
+            limit = 74
+        current.append(char)
+        size += char_size
+    folded.append(''.join(current))
+    return "\r\n ".join(folded) + "\r\n"
+
+# Function to create ICS file, returned as raw iCalendar bytes
+def create_ics_file(event_data, now=None):
+    if now is None:
+        now = datetime.now()
     
     # Ensure proper capitalization in event title
     event_title = event_data.get('event_title', 'New Event')
     event_title = capitalize_title(event_title)
-    event.add('summary', event_title)
     
     # Use current date if no specific date was requested
-    current_date = event_data.get('current_date', datetime.now().strftime('%Y-%m-%d'))
+    current_date = event_data.get('current_date') or now.strftime('%Y-%m-%d')
     
     # Format start datetime
     start_date = event_data.get('start_date', current_date)
     start_time = event_data.get('start_time', '09:00')
-    start_datetime = datetime.strptime(f"{start_date} {start_time}", '%Y-%m-%d %H:%M')
-    event.add('dtstart', start_datetime)
+    start_datetime = parse_event_datetime(start_date, start_time)
     
     # Format end datetime
     end_date = event_data.get('end_date', start_date)
     end_time = event_data.get('end_time')
     if end_time:
-        end_datetime = datetime.strptime(f"{end_date} {end_time}", '%Y-%m-%d %H:%M')
+        end_datetime = parse_event_datetime(end_date, end_time)
     else:
         # Default to 1 hour after start time
         end_datetime = start_datetime + timedelta(hours=1)
-    event.add('dtend', end_datetime)
+    
+    details = []
     
     # Add location if present (with proper capitalization)
     if event_data.get('location'):
         location = capitalize_location(event_data.get('location'))
-        event.add('location', location)
+        details.append(ics_property('LOCATION', location))
     
     # Add description if present
     if event_data.get('description'):
         description = event_data.get('description')
         # Clean up any grammar/capitalization issues in description
         description = fix_description_text(description)
-        event.add('description', description)
+        details.append(ics_property('DESCRIPTION', description))
     
-    # Add attendees if present
+    # Add attendees if present (line breaks stripped so LLM output cannot inject extra ICS lines)
     for attendee in event_data.get('attendees', []):
-        event.add('attendee', f'MAILTO:{attendee}')
-    
-    # Add a unique identifier
-    event.add('uid', str(uuid.uuid4()))
-    
-    # Add creation timestamp
-    event.add('dtstamp', datetime.now())
-    
-    # Add reminder (10 minutes before)
-    alarm = Event()
-    alarm.add('action', 'DISPLAY')
-    alarm.add('description', f"Reminder: {event_title}")
-    alarm.add('trigger', timedelta(minutes=-10))
-    event.add_component(alarm)
-    
-    cal.add_component(event)
-    
-    return cal.to_ical().decode('utf-8')
+        attendee = str(attendee or '').translate(ICS_LINE_BREAKS).strip()
+        if attendee:
+            details.append(ics_property('ATTENDEE', f'MAILTO:{attendee}', escape=False))
+    
+    ics_content = ICS_TEMPLATE.format_map({
+        'summary': ics_property('SUMMARY', event_title),
+        'dtstart': start_datetime.strftime(ICS_DATETIME_FORMAT),
+        'dtend': end_datetime.strftime(ICS_DATETIME_FORMAT),
+        'details': ''.join(details),
+        # Add a unique identifier (128 random bits, hex-encoded, without building a UUID object)
+        'uid': os.urandom(16).hex(),
+        # Add creation timestamp (RFC 5545 requires DTSTAMP in UTC; a naive now is local time)
+        'dtstamp': now.astimezone(timezone.utc).strftime(ICS_DATETIME_FORMAT) + 'Z',
+        # Add reminder (10 minutes before)
+        'reminder': ics_property('DESCRIPTION', f"Reminder: {event_title}")
+    })
+    
+    return ics_content.encode('utf-8')
+
+# Words that should not be capitalized in titles unless they are the first or last word
+TITLE_MINOR_WORDS = frozenset(['a', 'an', 'the', 'and', 'but', 'or', 'for', 'nor', 'on', 'at', 'to', 'from', 'by', 'in', 'of'])
+
+# Words that should not be capitalized in addresses unless they start an address part
+LOCATION_MINOR_WORDS = frozenset(['and', 'or', 'the', 'a', 'an', 'of', 'to', 'in', 'for', 'on', 'by', 'at'])
 
 # Helper function to capitalize event title properly
+@lru_cache(maxsize=4096)
 def capitalize_title(title):
     if not title:
         return 'New Event'
     
-    # Words that should not be capitalized unless they are the first or last word
-    minor_words = ['a', 'an', 'the', 'and', 'but', 'or', 'for', 'nor', 'on', 'at', 'to', 'from', 'by', 'in', 'of']
-    
+    # Capitalize every word except minor words in the middle of the title
     words = title.split()
-    result = []
-    
-    for i, word in enumerate(words):
-        # Always capitalize first and last words
-        if i == 0 or i == len(words) - 1:
-            result.append(word[0].upper() + word[1:].lower() if word else '')
-        # Don't capitalize minor words
-        elif word.lower() in minor_words:
-            result.append(word.lower())
-        # Capitalize other words
-        else:
-            result.append(word[0].upper() + word[1:].lower() if word else '')
-    
-    return ' '.join(result)
+    last = len(words) - 1
+    return ' '.join([
+        word_lower if 0 < i < last and (word_lower := word.lower()) in TITLE_MINOR_WORDS else word.capitalize()
+        for i, word in enumerate(words)
+    ])
 
 # Helper function to capitalize location properly
+@lru_cache(maxsize=4096)
 def capitalize_location(location):
     if not location:
         return ''
@@ -204,172 +314,298 @@ def capitalize_location(location):
     capitalized_parts = []
     
     for part in address_parts:
-        words = part.strip().split()
+        words = part.split()
         result = []
         
         for i, word in enumerate(words):
+            word_lower = word.lower()
             # Always capitalize first word in each part
             if i == 0:
-                result.append(word[0].upper() + word[1:].lower() if word else '')
+                result.append(word.capitalize())
             # Don't capitalize certain words in addresses
-            elif word.lower() in ['and', 'or', 'the', 'a', 'an', 'of', 'to', 'in', 'for', 'on', 'by', 'at']:
-                result.append(word.lower())
+            elif word_lower in LOCATION_MINOR_WORDS:
+                result.append(word_lower)
             # Keep acronyms in uppercase
-            elif word.upper() == word and len(word) <= 3:
-                result.append(word.upper())
+            elif len(word) <= 3 and word.isupper():
+                result.append(word)
             # Capitalize other words
             else:
-                result.append(word[0].upper() + word[1:].lower() if word else '')
+                result.append(word.capitalize())
         
         capitalized_parts.append(' '.join(result))
     
     return ', '.join(capitalized_parts)
 
+# Whitespace after sentence-ending punctuation, plus the first character of the next sentence
+SENTENCE_BREAK_PATTERN = re.compile(r'(?<=[.!?])\s+(\S?)')
+
+# Collapse a sentence break to one space and capitalize the sentence that follows it
+def capitalize_sentence_break(match):
+    next_char = match.group(1)
+    return ' ' + next_char.upper() if next_char else ''
+
 # Helper function to fix grammar and capitalization in description
+@lru_cache(maxsize=4096)
 def fix_description_text(text):
     if not text:
         return ''
     
-    # Split into sentences
-    sentences = re.split(r'(?<=[.!?])\s+', text)
-    fixed_sentences = []
+    # Capitalize the first letter of each sentence in a single pass
+    text = SENTENCE_BREAK_PATTERN.sub(capitalize_sentence_break, text)
+    return text[0].upper() + text[1:]
+
+# Helper function to build the /chat response for a detected calendar event
+def build_event_response(event_data, current_date, use_12h_format, now=None):
+    if event_data.get('requires_clarification', False):
+        # Return clarification question instead of generating event
+        return {
+            'message': event_data.get('clarification_question'),
+            'is_event': True,
+            'requires_clarification': True,
+            'event_data': event_data
+        }
+    
+    # Generate ICS file (raw iCalendar bytes)
+    ics_bytes = create_ics_file(event_data, now)
+    
+    # Format times for display in 12-hour format if requested
+    start_time_display = format_time_12h(event_data.get('start_time', '09:00')) if use_12h_format else event_data.get('start_time', '09:00')
+    end_time_display = format_time_12h(event_data.get('end_time', '10:00')) if use_12h_format and event_data.get('end_time') else event_data.get('end_time', 'Not specified')
+    
+    # Format date for display
+    date_display = format_date_long(event_data.get('start_date', current_date))
+    
+    # Create a friendly response with event details
+    friendly_response = f"""
+    I've created a calendar event based on your request:
+    
+    📅 **{event_data.get('event_title')}**
+    📆 Date: {date_display}
+    ⏰ Time: {start_time_display} - {end_time_display}
+    📍 Location: {event_data.get('location', 'Not specified')}
+    📝 Description: {event_data.get('description', 'Not specified')}
+    
+    The event has been created and a reminder has been set for 10 minutes before the event.
+    You can add this event to your calendar using the options below.
+    """
     
-    for sentence in sentences:
-        if sentence:
-            # Capitalize first letter of each sentence
-            fixed = sentence[0].upper() + sentence[1:] if sentence else ''
-            fixed_sentences.append(fixed)
+    return {
+        'message': friendly_response.strip(),
+        'is_event': True,
+        'event_data': event_data,
+        'ics_file': pybase64.b64encode(ics_bytes).decode('ascii')
+    }
+
+# Helper function to decode base64 media, with or without a "data:...;base64," prefix
+# (multi-MB uploads, so callers run it in a worker thread to keep the event loop free)
+def decode_base64_payload(data):
+    # Encode once and strip the prefix through a memoryview, so the multi-MB payload is not copied again
+    raw = data.encode('ascii')
+    payload = memoryview(raw)[raw.find(b',') + 1:]
+    return pybase64.b64decode(payload, validate=False)
+
+# Helper function to build the chat-history system prompt
+def build_context_prompt(chat_history, current_date, user_id):
+    return f"""
+    You are LiteCal, an AI assistant specialized in managing calendars and events.
     
-    return ' '.join(fixed_sentences)
+    Today's date is {current_date}.
+    
+    The user ID is {user_id}.
+    
+    Below is the relevant history of your past conversations with this user:
+    
+    {chat_history}
+    
+    When creating calendar events:
+    1. Use proper capitalization for event titles and locations
+    2. Use {current_date} as the default date if no date is specified
+    3. Use specific start and end times, not all-day events unless explicitly requested
+    4. Format times in 12-hour format (e.g., "2:00 PM" not "14:00")
+    5. Ensure proper grammar and punctuation in all responses
+    
+    Now, respond to the user's current message:
+    """
+
+# Helper function to build the Gemini content parts for a regular chat message
+async def build_content_parts(user_message, image_data, audio_data, chat_history, user_id, current_date):
+    content_parts = []
+    
+    # If chat history is provided, use it as context for RAG
+    if chat_history:
+        # Add a system message to provide context from previous conversations
+        content_parts.append(build_context_prompt(chat_history, current_date, user_id))
+    
+    # Handle image if provided
+    if image_data:
+        # Decode base64 image
+        image_bytes = await asyncio.to_thread(decode_base64_payload, image_data)
+        
+        # Add image to content parts
+        content_parts.append({
+            "mime_type": "image/jpeg",
+            "data": image_bytes
+        })
+    
+    # Handle audio if provided
+    if audio_data:
+        audio_bytes = await asyncio.to_thread(decode_base64_payload, audio_data)
+        content_parts.append({
+            "mime_type": "audio/mp3",
+            "data": audio_bytes
+        })
+    
+    # Add text if provided
+    if user_message:
+        content_parts.append(user_message)
+    
+    return content_parts
+
+# Helper function to read the fields shared by /chat and /chat/stream from the request body
+# (None if the body is not a JSON object)
+async def read_chat_request():
+    # Parse the raw body with orjson directly instead of going through request.get_json()
+    try:
+        data = orjson.loads(await request.get_data(cache=False))
+    except orjson.JSONDecodeError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    
+    # Read the clock once; the event parser, ICS timestamp and date default all reuse it
+    now = datetime.now()
+    today = now.strftime('%Y-%m-%d')
+    
+    return {
+        'now': now,
+        'today': today,
+        'user_message': data.get('message', ''),
+        'image_data': data.get('image', None),
+        'audio_data': data.get('audio', None),
+        'chat_history': data.get('history', None),  # Get chat history for RAG
+        'user_id': data.get('user_id', 'anonymous'),  # Get user ID for personalization
+        'current_date': data.get('current_date', today),  # Get current date
+        'use_12h_format': data.get('use_12h_format', True)  # Whether to use 12-hour time format
+    }
+
+# Helper function to build a JSON response directly from orjson bytes
+def json_response(payload, status=200):
+    return Response(orjson.dumps(payload), status=status, mimetype='application/json')
+
+# Helper function to format a server-sent event frame
+def sse_event(payload, event=None):
+    frame = f"data: {orjson.dumps(payload).decode('utf-8')}\n\n"
+    return f"event: {event}\n{frame}" if event else frame
 
 @app.route('/chat', methods=['POST'])
-def chat():
+async def chat():
     # Get the data from the request
-    data = request.json
-    user_message = data.get('message', '')
-    image_data = data.get('image', None)
-    audio_data = data.get('audio', None)
-    chat_history = data.get('history', None)  # Get chat history for RAG
-    user_id = data.get('user_id', 'anonymous')  # Get user ID for personalization
-    current_date = data.get('current_date', datetime.now().strftime('%Y-%m-%d'))  # Get current date
-    use_12h_format = data.get('use_12h_format', True)  # Whether to use 12-hour time format
+    chat_request = await read_chat_request()
+    if chat_request is None:
+        return json_response({'error': 'Request body must be a JSON object'}, status=400)
+    user_message = chat_request['user_message']
+    image_data = chat_request['image_data']
+    audio_data = chat_request['audio_data']
+    chat_history = chat_request['chat_history']
     
     if not user_message and not image_data and not audio_data:
-        return jsonify({'error': 'No message, image, or audio provided'}), 400
+        return json_response({'error': 'No message, image, or audio provided'}, status=400)
     
     try:
         # Check if the message appears to be a calendar event request
-        event_data = parse_calendar_event(user_message, chat_history)
+        event_data = await parse_calendar_event(
+            user_message, chat_history, chat_request['today'], has_media=bool(image_data or audio_data)
+        )
         
-        # If this is a calendar event and no clarification needed, generate ICS
+        # If this is a calendar event, generate ICS or ask for clarification
         if event_data.get('is_event', False):
-            if event_data.get('requires_clarification', False):
-                # Return clarification question instead of generating event
-                return jsonify({
-                    'message': event_data.get('clarification_question'),
-                    'is_event': True,
-                    'requires_clarification': True,
-                    'event_data': event_data
-                })
-            else:
-                # Generate ICS file
-                ics_content = create_ics_file(event_data)
-                
-                # Format times for display in 12-hour format if requested
-                start_time_display = format_time_12h(event_data.get('start_time', '09:00')) if use_12h_format else event_data.get('start_time', '09:00')
-                end_time_display = format_time_12h(event_data.get('end_time', '10:00')) if use_12h_format and event_data.get('end_time') else event_data.get('end_time', 'Not specified')
-                
-                # Format date for display
-                date_display = format_date_long(event_data.get('start_date', current_date))
-                
-                # Create a friendly response with event details
-                friendly_response = f"""
-                I've created a calendar event based on your request:
-                
-                📅 **{event_data.get('event_title')}**
-                📆 Date: {date_display}
-                ⏰ Time: {start_time_display} - {end_time_display}
-                📍 Location: {event_data.get('location', 'Not specified')}
-                📝 Description: {event_data.get('description', 'Not specified')}
-                
-                The event has been created and a reminder has been set for 10 minutes before the event.
-                You can add this event to your calendar using the options below.
-                """
-                
-                return jsonify({
-                    'message': friendly_response.strip(),
-                    'is_event': True,
-                    'event_data': event_data,
-                    'ics_file': base64.b64encode(ics_content.encode('utf-8')).decode('utf-8')
-                })
+            payload = build_event_response(
+                event_data, chat_request['current_date'], chat_request['use_12h_format'], chat_request['now']
+            )
+            return json_response(payload)
+
+        # Event detection already answered plain text messages, so skip the second Gemini call
+        if event_data.get('reply') and not image_data and not audio_data:
+            return json_response({'message': event_data['reply']})
 
         # If not a calendar event or inappropriate, process normally
-        # Initialize content_parts outside the conditional blocks
-        content_parts = []
-        
-        # If chat history is provided, use it as context for RAG
-        if chat_history:
-            # Add a system message to provide context from previous conversations
-            context_prompt = f"""
-            You are LiteCal, an AI assistant specialized in managing calendars and events.
-            
-            Today's date is {current_date}.
-            
-            The user ID is {user_id}.
-            
-            Below is the relevant history of your past conversations with this user:
-            
-            {chat_history}
-            
-            When creating calendar events:
-            1. Use proper capitalization for event titles and locations
-            2. Use {current_date} as the default date if no date is specified
-            3. Use specific start and end times, not all-day events unless explicitly requested
-            4. Format times in 12-hour format (e.g., "2:00 PM" not "14:00")
-            5. Ensure proper grammar and punctuation in all responses
-            
-            Now, respond to the user's current message:
-            """
-            content_parts.append(context_prompt)
-        
-        # Handle image if provided
-        if image_data:
-            # Decode base64 image
-            image_bytes = base64.b64decode(image_data.split(',')[1] if ',' in image_data else image_data)
-            
-            # Add image to content parts
-            content_parts.append({
-                "mime_type": "image/jpeg",
-                "data": image_bytes
-            })
-        
-        # Handle audio if provided
-        if audio_data:
-            audio_bytes = base64.b64decode(audio_data.split(',')[1] if ',' in audio_data else audio_data)
-            content_parts.append({
-                "mime_type": "audio/mp3",
-                "data": audio_bytes
-            })
-        
-        # Add text if provided
-        if user_message:
-            content_parts.append(user_message)
+        content_parts = await build_content_parts(
+            user_message, image_data, audio_data, chat_history,
+            chat_request['user_id'], chat_request['current_date']
+        )
         
         # Generate response based on content
         if content_parts:
-            response = model.generate_content(content_parts)
+            response = await model.generate_content_async(content_parts)
         else:
             # This should never happen due to the initial check, but just in case
-            return jsonify({'error': 'No valid content to process'}), 400
+            return json_response({'error': 'No valid content to process'}, status=400)
         
         # Extract the text from the response
         ai_message = response.text
         
         # Return the AI response
-        return jsonify({'message': ai_message})
+        return json_response({'message': ai_message})
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return json_response({'error': str(e)}, status=500)
+
+# Streaming variant of /chat: emits the reply as server-sent "delta" events, then a final "done" event
+# carrying the same payload /chat would return. Only image/audio replies are streamed chunk by chunk;
+# text replies and events come from the blocking detection call and arrive as a single delta
+@app.route('/chat/stream', methods=['POST'])
+async def chat_stream():
+    chat_request = await read_chat_request()
+    if chat_request is None:
+        return json_response({'error': 'Request body must be a JSON object'}, status=400)
+    user_message = chat_request['user_message']
+    image_data = chat_request['image_data']
+    audio_data = chat_request['audio_data']
+    chat_history = chat_request['chat_history']
+    
+    if not user_message and not image_data and not audio_data:
+        return json_response({'error': 'No message, image, or audio provided'}, status=400)
+    
+    async def generate():
+        try:
+            # Event detection needs the complete JSON, so this step stays blocking
+            event_data = await parse_calendar_event(
+                user_message, chat_history, chat_request['today'], has_media=bool(image_data or audio_data)
+            )
+            if event_data.get('is_event', False):
+                payload = build_event_response(
+                    event_data, chat_request['current_date'], chat_request['use_12h_format'], chat_request['now']
+                )
+                yield sse_event({'delta': payload['message']})
+                yield sse_event(payload, event='done')
+                return
+            
+            # Event detection already answered plain text messages, so skip the second Gemini call
+            if event_data.get('reply') and not image_data and not audio_data:
+                payload = {'message': event_data['reply']}
+                yield sse_event({'delta': payload['message']})
+                yield sse_event(payload, event='done')
+                return
+            
+            content_parts = await build_content_parts(
+                user_message, image_data, audio_data, chat_history,
+                chat_request['user_id'], chat_request['current_date']
+            )
+            
+            # Forward each chunk to the client as soon as Gemini produces it
+            chunks = []
+            async for chunk in await model.generate_content_async(content_parts, stream=True):
+                if chunk.text:
+                    chunks.append(chunk.text)
+                    yield sse_event({'delta': chunk.text})
+            
+            payload = {'message': ''.join(chunks)}
+            yield sse_event(payload, event='done')
+        except Exception as e:
+            yield sse_event({'error': str(e)}, event='error')
+    
+    # Keep proxies from caching or buffering the stream
+    return Response(generate(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
 
 # Helper function to format time in 12-hour format
 def format_time_12h(time_str):
@@ -390,16 +626,38 @@ def format_time_12h(time_str):
     except:
         return time_str
 
+# Helper function to parse a "YYYY-MM-DD" date; fromisoformat is the fast path, strptime
+# still accepts dates without zero padding (e.g. "2024-5-1")
+def parse_event_date(date_str):
+    try:
+        return date.fromisoformat(date_str)
+    except ValueError:
+        return datetime.strptime(date_str, '%Y-%m-%d').date()
+
+# Helper function to build a datetime from "YYYY-MM-DD" and "HH:MM" strings
+def parse_event_datetime(date_str, time_str):
+    day = parse_event_date(date_str)
+    hours, minutes = time_str.split(':')
+    return datetime(day.year, day.month, day.day, int(hours), int(minutes))
+
 # Helper function to format date in a long format
 def format_date_long(date_str):
     if not date_str:
         return 'Not specified'
     
     try:
-        date_obj = datetime.strptime(date_str, '%Y-%m-%d')
+        date_obj = parse_event_date(date_str)
         return date_obj.strftime('%A, %B %d, %Y')  # Example: Monday, January 1, 2023
     except:
         return date_str
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5001, debug=True)
\ No newline at end of file
+    if os.environ.get('LITECAL_DEV') == '1':
+        # Local development server with the debugger and reloader
+        app.run(host='0.0.0.0', port=5001, debug=True)
+    else:
+        # Production ASGI server; loop='auto' uses uvloop when it is installed
+        import uvicorn
+        workers = int(os.environ.get('WEB_CONCURRENCY', 2 * (os.cpu_count() or 1)))
+        uvicorn.run('app:app', host='0.0.0.0', port=5001, workers=workers, loop='auto',
+                    app_dir=os.path.dirname(os.path.abspath(__file__)))
\ No newline at end of file
@@ -0,0 +1,38 @@
+from types import SimpleNamespace
+
+import pytest
+
+import app
+
+
+# Stand-in for the Gemini model that records every call: plain calls return the given texts
+# in order (the last one repeats), streamed calls yield chunks, and error is raised when set
+class FakeModel:
+    def __init__(self, *texts, chunks=(), error=None):
+        self.texts = texts
+        self.chunks = chunks
+        self.error = error
+        self.calls = []
+
+    async def generate_content_async(self, contents, stream=False):
+        self.calls.append((contents, stream))
+        if self.error:
+            raise self.error
+        if stream:
+            return self.stream()
+        plain_calls = sum(1 for _, streamed in self.calls if not streamed)
+        return SimpleNamespace(text=self.texts[min(plain_calls, len(self.texts)) - 1])
+
+    async def stream(self):
+        for text in self.chunks:
+            yield SimpleNamespace(text=text)
+
+
+@pytest.fixture
+def fake_model(monkeypatch):
+    # Install a FakeModel as app.model: fake = fake_model('{"is_event": false}')
+    def install(*texts, **kwargs):
+        fake = FakeModel(*texts, **kwargs)
+        monkeypatch.setattr(app, 'model', fake)
+        return fake
+    return install
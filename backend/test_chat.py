@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+
+import app
+
+# A caption with an event hint ("dinner"), so image requests still go through event detection
+IMAGE_REQUEST = {'message': 'is this a good dinner spot?', 'image': 'data:image/jpeg;base64,aGVsbG8='}
+
+
+def post_chat(body):
+    async def run():
+        response = await app.app.test_client().post('/chat', json=body)
+        return response.status_code, await response.get_json()
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("detection_reply, message", [
+    ('{"is_event": false, "reply": "Hi there!"}', 'Hi there!'),
+    # Multi-line replies come back with literal newlines inside the JSON string
+    ('```json\n{"is_event": false, "reply": "Sure!\n- Lunch\n- Dinner"}\n```', 'Sure!\n- Lunch\n- Dinner'),
+])
+def test_text_reply_comes_from_detection_call(fake_model, detection_reply, message):
+    fake = fake_model(detection_reply)
+    assert post_chat({'message': 'hello'}) == (200, {'message': message})
+    assert len(fake.calls) == 1
+
+
+@pytest.mark.parametrize("detection_reply", [
+    '{"is_event": false}',
+    'Sorry, I cannot help with that.',
+    '{"is_event": false, "reply": "Hi',
+])
+def test_missing_or_unparseable_reply_falls_back_to_second_call(fake_model, detection_reply):
+    fake = fake_model(detection_reply, 'Fallback answer')
+    assert post_chat({'message': 'hello'}) == (200, {'message': 'Fallback answer'})
+    assert len(fake.calls) == 2
+
+
+def test_media_request_never_uses_detection_reply(fake_model):
+    fake = fake_model('{"is_event": false, "reply": "Unused"}', 'Looks great')
+    assert post_chat(IMAGE_REQUEST) == (200, {'message': 'Looks great'})
+    assert len(fake.calls) == 2
+    # The detection prompt for media requests does not ask Gemini to write a reply
+    detection_prompt = fake.calls[0][0]
+    assert 'just return' in detection_prompt
+    assert '"reply"' not in detection_prompt
@@ -0,0 +1,78 @@
+import asyncio
+
+import orjson
+
+import app
+
+EVENT_REPLY = (
+    '{"is_event": true, "event_title": "team sync", "start_date": "2025-03-04", "start_time": "14:30",'
+    ' "end_time": "15:30", "specified_date": true}'
+)
+
+# A caption with no event hints, so image requests go straight to the streamed reply
+IMAGE_REQUEST = {'message': 'What is this?', 'image': 'data:image/jpeg;base64,aGVsbG8='}
+
+
+def post_stream(body):
+    async def run():
+        response = await app.app.test_client().post('/chat/stream', json=body)
+        return response, (await response.get_data()).decode('utf-8')
+
+    return asyncio.run(run())
+
+
+def parse_events(body):
+    events = []
+    for frame in body.split('\n\n'):
+        if not frame:
+            continue
+        name = 'message'
+        for line in frame.split('\n'):
+            if line.startswith('event: '):
+                name = line[len('event: '):]
+            elif line.startswith('data: '):
+                events.append((name, orjson.loads(line[len('data: '):])))
+    return events
+
+
+def test_streams_deltas_then_done(fake_model):
+    fake = fake_model(chunks=['It is ', '', 'a cat.'])
+    response, body = post_stream(IMAGE_REQUEST)
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    assert response.headers['Cache-Control'] == 'no-cache'
+    assert parse_events(body) == [
+        ('message', {'delta': 'It is '}),
+        ('message', {'delta': 'a cat.'}),
+        ('done', {'message': 'It is a cat.'}),
+    ]
+    assert [stream for _, stream in fake.calls] == [True]
+
+
+def test_text_reply_arrives_as_single_delta(fake_model):
+    # Text messages are answered by the detection call, so nothing is streamed from Gemini
+    fake = fake_model('{"is_event": false, "reply": "Hi there! How can I help?"}')
+    _, body = post_stream({'message': 'hello'})
+    assert parse_events(body) == [
+        ('message', {'delta': 'Hi there! How can I help?'}),
+        ('done', {'message': 'Hi there! How can I help?'}),
+    ]
+    assert [stream for _, stream in fake.calls] == [False]
+
+
+def test_event_ends_with_ics_file(fake_model):
+    fake_model(EVENT_REPLY)
+    _, body = post_stream({'message': 'team sync on 3/4 at 2:30pm'})
+    events = parse_events(body)
+    assert [name for name, _ in events] == ['message', 'done']
+    done = events[-1][1]
+    assert events[0][1] == {'delta': done['message']}
+    assert done['is_event'] is True
+    assert done['event_data']['event_title'] == 'Team Sync'
+    assert done['ics_file']
+
+
+def test_gemini_failure_sends_error_event(fake_model):
+    fake_model(error=RuntimeError('quota exceeded'))
+    _, body = post_stream({'message': 'hello'})
+    assert parse_events(body) == [('error', {'error': 'quota exceeded'})]
@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from app import EVENT_HINT_PATTERN, parse_calendar_event
+
+# Image/audio captions that must reach Gemini for event detection
+EVENT_MESSAGES = [
+    "Lunch with Sam at noon",
+    "team meeting tomorrow at 3pm",
+    "Dentist at 10:30",
+    "dentist on 5/12",
+    "gym on the 5th",
+    "Pick up kids Friday",
+    "Gym in 30 minutes",
+    "Dentist in two hours",
+    "Haircut at five",
+    "Set up a 1:1 with Priya",
+    "Add haircut with Joe",
+    "Put dentist on my cal",
+    "Doctor 2 weeks from now",
+    "Team sync every 2 weeks",
+    "Dentist 3 days from now",
+    "Vet appt 4 days out",
+    "Standup on weekday mornings",
+    "Review in 6 months",
+]
+
+# Image/audio captions that skip the event-detection call
+NON_EVENT_MESSAGES = [
+    "hi how are you",
+    "what can you do?",
+    "Tell me a joke",
+    "thanks!",
+    "Explain quantum physics",
+]
+
+
+@pytest.mark.parametrize("message", EVENT_MESSAGES)
+def test_event_messages_match(message):
+    assert EVENT_HINT_PATTERN.search(message)
+
+
+@pytest.mark.parametrize("message", NON_EVENT_MESSAGES)
+def test_plain_chat_does_not_match(message):
+    assert not EVENT_HINT_PATTERN.search(message)
+
+
+def test_null_message_is_not_an_event():
+    # Image/audio-only requests may send "message": null; this must not reach the regex as None
+    assert asyncio.run(parse_calendar_event(None, None, has_media=True)) == {"is_event": False}
+
+
+@pytest.mark.parametrize("message", ["Haircut with Joe", "Concert with Sara", "Doctor checkup"])
+def test_text_messages_always_reach_gemini(fake_model, message):
+    # Text messages are answered by the detection call, so no hint list may keep them from it
+    fake = fake_model('{"is_event": true, "event_title": "haircut with joe", "specified_date": false}')
+    event_data = asyncio.run(parse_calendar_event(message, None, '2025-03-04'))
+    assert len(fake.calls) == 1
+    assert event_data['is_event'] is True
+    assert event_data['start_date'] == '2025-03-04'
+
+
+def test_media_caption_without_hints_skips_detection(fake_model):
+    fake = fake_model('{"is_event": true}')
+    history = "Assistant: How can I help you today?\n"
+    assert asyncio.run(parse_calendar_event("Haircut with Joe", history, has_media=True)) == {"is_event": False}
+    assert fake.calls == []
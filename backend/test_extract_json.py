@@ -0,0 +1,22 @@
+import asyncio
+
+from app import extract_json_object, parse_calendar_event
+
+
+def test_fenced_object():
+    text = '```json\n{"is_event": false, "reply": "Hi"}\n```'
+    assert extract_json_object(text) == {"is_event": False, "reply": "Hi"}
+
+
+def test_object_followed_by_text_with_braces():
+    text = 'Here you go: {"is_event": true, "event_title": "Sync"} (use {"is_event": false} otherwise)'
+    assert extract_json_object(text) == {"is_event": True, "event_title": "Sync"}
+
+
+def test_no_object_returns_none():
+    assert extract_json_object('I could not find an event in that message.') is None
+
+
+def test_truncated_object_is_not_an_event(fake_model):
+    fake_model('{"is_event": true, "event_title": "Sy')
+    assert asyncio.run(parse_calendar_event('Sync tomorrow at 3pm', None, '2025-03-04')) == {"is_event": False}
@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta, timezone
+
+from app import create_ics_file, ics_property
+
+NOW = datetime(2025, 3, 1, 8, 0, 0, tzinfo=timezone(timedelta(hours=-5)))
+
+
+def make_ics(**fields):
+    event_data = {
+        'event_title': 'Team Sync',
+        'start_date': '2025-03-04',
+        'start_time': '14:30',
+        'current_date': '2025-03-04',
+    }
+    event_data.update(fields)
+    return create_ics_file(event_data, NOW).decode('utf-8')
+
+
+def unfold(ics):
+    return ics.replace('\r\n ', '')
+
+
+def test_text_values_are_escaped():
+    ics = make_ics(
+        event_title='sync, q3; review',
+        location='room a, 100 main st; floor 2',
+        description='bring notes\\ and laptops.\nthen leave, early; ok',
+    )
+    lines = unfold(ics).split('\r\n')
+    assert 'SUMMARY:Sync\\, Q3\\; Review' in lines
+    assert 'LOCATION:Room a\\, 100 Main St\\; Floor 2' in lines
+    assert 'DESCRIPTION:Bring notes\\\\ and laptops. Then leave\\, early\\; ok' in lines
+    assert not any('\n' in line for line in lines)
+
+
+def test_newlines_in_text_are_escaped_not_emitted():
+    line = ics_property('DESCRIPTION', 'first\r\nsecond\nthird')
+    assert line == 'DESCRIPTION:first\\nsecond\\nthird\r\n'
+
+
+def test_long_lines_fold_at_75_octets_without_splitting_utf8():
+    line = ics_property('DESCRIPTION', 'é' * 100 + 'x' * 50)
+    physical = line[:-2].split('\r\n')
+    assert len(physical) > 1
+    for part in physical:
+        assert len(part.encode('utf-8')) <= 75
+        part.encode('utf-8').decode('utf-8')
+    assert all(part.startswith(' ') for part in physical[1:])
+    assert unfold(line) == 'DESCRIPTION:' + 'é' * 100 + 'x' * 50 + '\r\n'
+
+
+def test_short_lines_are_not_folded():
+    assert ics_property('SUMMARY', 'Team Sync') == 'SUMMARY:Team Sync\r\n'
+
+
+def test_attendee_line_breaks_cannot_inject_lines():
+    ics = make_ics(attendees=['a@b.com\r\nBEGIN:VEVENT', None, ''])
+    lines = ics.split('\r\n')
+    assert 'ATTENDEE:MAILTO:a@b.comBEGIN:VEVENT' in lines
+    assert lines.count('BEGIN:VEVENT') == 1
+    assert sum(line.startswith('ATTENDEE') for line in lines) == 1
+
+
+def test_event_and_alarm_layout():
+    lines = make_ics().split('\r\n')
+    assert lines[:4] == ['BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:-//LiteCal//litecal.app//', 'BEGIN:VEVENT']
+    assert 'DTSTART:20250304T143000' in lines
+    assert 'DTEND:20250304T153000' in lines
+    assert 'DTSTAMP:20250301T130000Z' in lines
+    alarm = lines.index('BEGIN:VALARM')
+    assert lines[alarm:alarm + 5] == [
+        'BEGIN:VALARM',
+        'ACTION:DISPLAY',
+        'DESCRIPTION:Reminder: Team Sync',
+        'TRIGGER:-PT10M',
+        'END:VALARM',
+    ]
+    assert lines[alarm + 5:] == ['END:VEVENT', 'END:VCALENDAR', '']